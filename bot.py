@@ -0,0 +1,380 @@
+"""Telegram-бот «Логосфера»: идиомы и цитаты на двух языках."""
+
+import asyncio
+import functools
+import logging
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Final, Optional, Union
+
+import cachetools
+
+try:  # uvloop необязателен, но заметно ускоряет планировщик asyncio
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from dotenv import load_dotenv
+from telegram import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Update,
+    User,
+)
+from telegram.ext import (
+    Application,
+    CallbackQueryHandler,
+    CommandHandler,
+    ContextTypes,
+    MessageHandler,
+    filters,
+)
+
+import greeting as greeting_module
+import idiom_explainer
+from database import Database
+from practice import PracticeModule
+from state_store import InMemoryStateStore, StateStore, make_state_store
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+practice_module = PracticeModule()
+
+# Подключения к БД и Redis поднимаются в main(), а не при импорте:
+# импорт модуля ради обработчиков (например, в тестах) не должен
+# читать .env и ходить по сети.
+db: Optional[Database] = None
+state_store: Optional[Union[StateStore, InMemoryStateStore]] = None
+
+
+def _init_runtime() -> None:
+    global db, state_store
+    load_dotenv()
+    db = Database()
+    state_store = make_state_store(db)
+
+# Синхронные методы Database блокируют event loop — выполняем их в пуле
+# потоков, чтобы медленный запрос одного чата не тормозил остальные.
+_DB_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="db")
+
+
+async def _db(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(
+        _DB_POOL, functools.partial(fn, *args, **kwargs)
+    )
+
+
+# PTB обрабатывает апдейты конкурентно; чтобы два нажатия одного
+# пользователя не гонялись за состоянием, сериализуем их пер-юзерным
+# замком. WeakValueDictionary отдаёт неиспользуемые замки сборщику мусора.
+_user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _user_lock(user_id: int) -> asyncio.Lock:
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _user_locks[user_id] = lock
+    return lock
+
+
+# Профили почти не меняются, а get_or_create_user дёргается на каждое
+# нажатие кнопки — держим их 5 минут в памяти вместо похода в БД.
+user_cache = cachetools.TTLCache(maxsize=10_000, ttl=300)
+
+
+@functools.lru_cache(maxsize=2048)
+def _idiom_by_id(idiom_id: int) -> Optional[dict]:
+    """Идиомы — неизменяемый контент, точечные выборки кэшируем навсегда."""
+    return db.get_idiom_by_id(idiom_id)
+
+
+async def get_db_user(user: User) -> dict:
+    """Профиль из кэша; в БД идём на промахе или при смене username."""
+    cached = user_cache.get(user.id)
+    if cached is not None and cached.get("username") == user.username:
+        return cached
+    db_user = await _db(db.get_or_create_user, user.id, user.username)
+    user_cache[user.id] = db_user
+    return db_user
+
+
+# Отпечаток последнего отрисованного (text, markup) по сообщению:
+# повторное нажатие «Главное меню» не должно стоить HTTPS round trip
+# и ловить BadRequest «message is not modified» от Telegram.
+_last_paint = cachetools.LRUCache(maxsize=10_000)
+
+
+async def _edit(
+    query: CallbackQuery,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    **kwargs: Any,
+) -> None:
+    message = query.message
+    key = (message.chat_id, message.message_id)
+    fingerprint = hash((text, reply_markup.to_json() if reply_markup else None))
+    if _last_paint.get(key) == fingerprint:
+        return
+    await query.edit_message_text(text, reply_markup=reply_markup, **kwargs)
+    _last_paint[key] = fingerprint
+
+
+# Постоянные тексты экранов: собираем строки один раз при импорте,
+# в обработчиках остаются только ссылки на константы.
+_MAIN_MENU_TEXT: Final[str] = "Главное меню. Что будем делать?"
+_ALL_DONE_TEXT: Final[str] = "🎉 Вы изучили все идиомы!"
+_CORRECT_TEXT: Final[str] = "✅ Верно! Идиома засчитана."
+_WRONG_TEXT: Final[str] = "❌ Не совсем. Попробуете ещё раз?"
+_REFLECTION_PROMPT: Final[str] = (
+    "💭 Напишите, как вы поняли идиому или где могли бы её употребить."
+)
+_THANKS_TEXT: Final[str] = "Спасибо, записал! 💾"
+_FALLBACK_TEXT: Final[str] = "Я понимаю только кнопки и команду /start 🙂"
+
+# Статические клавиатуры не зависят от пользователя — собираем их один раз
+# при импорте вместо пересоздания списков и Markup-объектов на каждый callback.
+_MAIN_MENU_MARKUP = InlineKeyboardMarkup(greeting_module.get_menu_keyboard())
+_BACK_MAIN_MARKUP = InlineKeyboardMarkup(
+    [[InlineKeyboardButton("🔙 Главное меню", callback_data="main_menu")]]
+)
+_IDIOM_MARKUP = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("🎯 Практика", callback_data="practice")],
+        [InlineKeyboardButton("💭 Рефлексия", callback_data="reflection")],
+        [InlineKeyboardButton("🔙 Главное меню", callback_data="main_menu")],
+    ]
+)
+_CORRECT_MARKUP = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("📖 Ещё идиома", callback_data="random_idiom")],
+        [InlineKeyboardButton("🔙 Главное меню", callback_data="main_menu")],
+    ]
+)
+_WRONG_MARKUP = InlineKeyboardMarkup(
+    [
+        [InlineKeyboardButton("🔄 Попробовать снова", callback_data="practice")],
+        [InlineKeyboardButton("🔙 Главное меню", callback_data="main_menu")],
+    ]
+)
+
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = update.effective_user
+    async with _user_lock(user.id):
+        await get_db_user(user)
+        await state_store.clear(user.id)
+    await update.message.reply_text(
+        greeting_module.get_greeting(), reply_markup=_MAIN_MENU_MARKUP
+    )
+
+
+async def show_main_menu(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await state_store.clear(query.from_user.id)
+    await _edit(
+        query, _MAIN_MENU_TEXT, reply_markup=_MAIN_MENU_MARKUP
+    )
+
+
+async def show_random_idiom(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = query.from_user
+    db_user = await get_db_user(user)
+    idiom = await _db(db.get_random_idiom, db_user["id"])
+    if idiom is None:
+        await _edit(
+            query, _ALL_DONE_TEXT, reply_markup=_MAIN_MENU_MARKUP
+        )
+        return
+    await _db(db.update_user_progress, db_user["id"], idiom["id"], "in_progress")
+    await state_store.set(user.id, {"current_idiom": idiom["id"]})
+    await _edit(
+        query,
+        idiom_explainer.format_idiom_explanation(idiom),
+        reply_markup=_IDIOM_MARKUP,
+        parse_mode="Markdown",
+    )
+
+
+async def show_practice(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = query.from_user
+    state = await state_store.get(user.id)
+    idiom_id = state.get("current_idiom")
+    if idiom_id is None:
+        await show_random_idiom(query, context)
+        return
+    idiom = await _db(_idiom_by_id, idiom_id)
+    if idiom is None:
+        await show_random_idiom(query, context)
+        return
+    all_idioms = await _db(db.get_idioms_by_topic)
+    exercise = practice_module.generate_exercise(idiom, all_idioms)
+    await state_store.set(
+        user.id, {"current_idiom": idiom_id, "correct": exercise["correct"]}
+    )
+    keyboard = [
+        [InlineKeyboardButton(option, callback_data=f"check_{index}")]
+        for index, option in enumerate(exercise["options"])
+    ]
+    await _edit(
+        query,
+        f"Что означает идиома «{exercise['question']}»?",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
+
+
+async def check_answer(
+    query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE, rest: str
+) -> None:
+    # rest — хвост callback data после единственного partition в диспетчере;
+    # никаких повторных split/replace по строке.
+    try:
+        answer_index = int(rest)
+    except ValueError:
+        logger.warning("Некорректный индекс ответа: %r", rest)
+        await show_main_menu(query, context)
+        return
+    user = query.from_user
+    db_user = await get_db_user(user)
+    state = await state_store.get(user.id)
+    if state.get("correct") is None:
+        await show_main_menu(query, context)
+        return
+    if answer_index == state["correct"]:
+        await _db(db.update_user_progress, db_user["id"], state["current_idiom"], "completed")
+        await state_store.clear(user.id)
+        await _edit(
+            query, _CORRECT_TEXT, reply_markup=_CORRECT_MARKUP
+        )
+    else:
+        await show_wrong_answer(query, context)
+
+
+async def show_wrong_answer(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await _edit(
+        query, _WRONG_TEXT, reply_markup=_WRONG_MARKUP
+    )
+
+
+async def show_achievements(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = query.from_user
+    db_user = await get_db_user(user)
+    progress, achievements, _ = await _db(db.get_user_dashboard, db_user["id"])
+    lines = [f"🏆 Достижения (изучено идиом: {progress['completed']}):", ""]
+    if achievements:
+        lines += [f"• {a['title']} — {a['description']}" for a in achievements]
+    else:
+        lines.append("Пока пусто. Изучите первую идиому!")
+    await _edit(query, "\n".join(lines), reply_markup=_BACK_MAIN_MARKUP)
+
+
+async def show_stats(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = query.from_user
+    db_user = await get_db_user(user)
+    progress, _, reflections = await _db(db.get_user_dashboard, db_user["id"])
+    text = (
+        "📊 Ваша статистика:\n\n"
+        f"Изучено идиом: {progress['completed']}\n"
+        f"В процессе: {progress['in_progress']}\n"
+        f"Рефлексий: {reflections['total']}"
+    )
+    await _edit(query, text, reply_markup=_BACK_MAIN_MARKUP)
+
+
+async def start_reflection(query: CallbackQuery, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = query.from_user
+    await state_store.update(user.id, awaiting_reflection=True)
+    await _edit(
+        query, _REFLECTION_PROMPT,
+        reply_markup=_BACK_MAIN_MARKUP,
+    )
+
+
+async def handle_reflection(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, state: dict
+) -> None:
+    user = update.effective_user
+    db_user = await get_db_user(user)
+    await _db(db.save_reflection, db_user["id"], state.get("current_idiom"), update.message.text)
+    await state_store.update(user.id, awaiting_reflection=False)
+    await update.message.reply_text(
+        _THANKS_TEXT, reply_markup=_MAIN_MENU_MARKUP
+    )
+
+
+async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = update.effective_user
+    async with _user_lock(user.id):
+        # Сначала смотрим состояние: случайное сообщение от чата без
+        # активного диалога не должно стоить нам похода в БД.
+        state = await state_store.get(user.id)
+        if state.get("awaiting_reflection"):
+            await handle_reflection(update, context, state)
+            return
+    await update.message.reply_text(
+        _FALLBACK_TEXT, reply_markup=_MAIN_MENU_MARKUP
+    )
+
+
+# Диспетчеризация callback'ов: O(1) поиск в словаре вместо цепочки
+# сравнений строк. Точные совпадения — первый словарь, data вида
+# "check_3" — второй, по префиксу до первого "_".
+_EXACT_HANDLERS = {
+    "main_menu": show_main_menu,
+    "random_idiom": show_random_idiom,
+    "practice": show_practice,
+    "achievements": show_achievements,
+    "stats": show_stats,
+    "reflection": start_reflection,
+}
+_PREFIX_HANDLERS = {
+    "check_": check_answer,
+}
+
+
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    # Подтверждение нажатия и сама обработка — независимые HTTP-вызовы:
+    # пускаем ack фоном и дожидаемся его уже после отправки ответа.
+    ack = asyncio.create_task(query.answer())
+    data = query.data
+    try:
+        async with _user_lock(query.from_user.id):
+            handler = _EXACT_HANDLERS.get(data)
+            if handler is not None:
+                await handler(query, context)
+                return
+            prefix, sep, rest = data.partition("_")
+            handler = _PREFIX_HANDLERS.get(prefix + sep)
+            if handler is not None:
+                await handler(query, context, rest)
+                return
+        logger.warning("Неизвестный callback: %s", data)
+    finally:
+        await ack
+
+
+def main() -> None:
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    _init_runtime()
+    token = os.getenv("TELEGRAM_TOKEN")
+    if not token:
+        raise RuntimeError("TELEGRAM_TOKEN не задан")
+    application = Application.builder().token(token).build()
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(
+        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text)
+    )
+    application.run_polling()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+"""Слой доступа к PostgreSQL: пользователи, идиомы, прогресс, цитаты."""
+
+import csv
+import io
+import logging
+import os
+import random
+import re
+from contextlib import contextmanager
+
+import cachetools
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock, под которым выполняется бутстрап схемы.
+_BOOTSTRAP_LOCK = 42
+
+_COPY_STAGE_SQL = (
+    "COPY quotations_stage (text, author, source) "
+    "FROM STDIN WITH (FORMAT csv, DELIMITER E'\t')"
+)
+
+# Горячие запросы готовятся на сервере один раз на соединение (PREPARE)
+# и дальше выполняются по имени: Postgres не парсит и не планирует их
+# заново на каждый вызов. Значения в SQL ниже — строки EXECUTE,
+# подставляющие параметры в готовый план.
+PREPARED = {
+    "user_by_tid": "SELECT * FROM users WHERE telegram_id = $1",
+    "user_insert": "INSERT INTO users (telegram_id, username) VALUES ($1, $2) RETURNING *",
+    "user_set_name": "UPDATE users SET username = $1 WHERE id = $2",
+    "idiom_by_id": "SELECT * FROM idioms WHERE id = $1",
+    # Случайный выбор делает Python: из БД берётся только список
+    # незавершённых id (он кэшируется на пользователя), сама идиома
+    # потом достаётся точечным idiom_by_id. Незавершённые считаются
+    # анти-джойном: NOT IN с подзапросом мешал планировщику (и опасен
+    # при NULL в idiom_id), LEFT JOIN ... IS NULL ложится на частичный
+    # индекс ix_up_user_completed.
+    "candidate_ids": """
+        SELECT i.id FROM idioms i
+        LEFT JOIN user_progress up
+            ON up.idiom_id = i.id
+           AND up.user_id = $1
+           AND up.status = 'completed'
+        WHERE up.idiom_id IS NULL
+    """,
+    # Один round trip на завершение идиомы: upsert прогресса и выдача
+    # достижений в одном выражении. Изменения из upd не видны другим
+    # частям того же запроса, поэтому cnt считает «как будет после
+    # записи»: завершённые без текущей идиомы плюс сама запись.
+    "progress_upsert": """
+        WITH upd AS (
+            INSERT INTO user_progress (user_id, idiom_id, status)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (user_id, idiom_id) DO UPDATE
+            SET status = EXCLUDED.status, updated_at = NOW()
+            RETURNING user_id
+        ), cnt AS (
+            SELECT COUNT(*) FILTER (WHERE idiom_id <> $2)
+                   + CASE WHEN $3 = 'completed' THEN 1 ELSE 0 END AS c
+            FROM user_progress
+            WHERE user_id = $1 AND status = 'completed'
+        )
+        INSERT INTO user_achievements (user_id, achievement_id)
+        SELECT $1, a.id FROM achievements a, cnt
+        WHERE a.threshold <= cnt.c AND a.code != 'thinker'
+        ON CONFLICT DO NOTHING
+    """,
+    "progress_counts": """
+        SELECT
+            COUNT(*) FILTER (WHERE status = 'completed') AS completed,
+            COUNT(*) FILTER (WHERE status = 'in_progress') AS in_progress
+        FROM user_progress WHERE user_id = $1
+    """,
+    "achievements_list": """
+        SELECT a.code, a.title, a.description, ua.earned_at
+        FROM user_achievements ua
+        JOIN achievements a ON a.id = ua.achievement_id
+        WHERE ua.user_id = $1
+        ORDER BY ua.earned_at
+    """,
+    "reflection_insert": "INSERT INTO reflections (user_id, idiom_id, text) VALUES ($1, $2, $3)",
+    "reflection_count": "SELECT COUNT(*) AS total FROM reflections WHERE user_id = $1",
+}
+
+_PREPARE_SCRIPT = ";\n".join(
+    f"PREPARE st_{name} AS {text}" for name, text in PREPARED.items()
+)
+
+
+def _execute_stub(name, text):
+    """EXECUTE-обёртка: число параметров — наибольший индекс $n в тексте."""
+    params = max((int(m) for m in re.findall(r"\$(\d+)", text)), default=0)
+    if params == 0:
+        return f"EXECUTE st_{name}"
+    return f"EXECUTE st_{name} ({', '.join(['%s'] * params)})"
+
+
+SQL = {
+    "idioms_all": "SELECT * FROM idioms",
+    "idioms_by_topic": "SELECT * FROM idioms WHERE topic = %s",
+    "quotation_count": "SELECT COUNT(*) AS n FROM quotations WHERE is_validated",
+    "quotations_page": """
+        SELECT * FROM quotations WHERE is_validated
+        ORDER BY created_at DESC LIMIT %s
+    """,
+    "quotations_all": """
+        SELECT * FROM quotations WHERE is_validated
+        ORDER BY created_at DESC
+    """,
+    "state_upsert": """
+        INSERT INTO user_state (user_id, blob) VALUES (%s, %s)
+        ON CONFLICT (user_id) DO UPDATE
+        SET blob = EXCLUDED.blob, updated_at = NOW()
+    """,
+    "state_get": "SELECT blob FROM user_state WHERE user_id = %s",
+    "state_delete": "DELETE FROM user_state WHERE user_id = %s",
+}
+SQL.update({name: _execute_stub(name, text) for name, text in PREPARED.items()})
+
+ACHIEVEMENTS_SEED = [
+    ("first_steps", "Первые шаги", "Изучите первую идиому", 1),
+    ("apprentice", "Подмастерье", "Изучите 10 идиом", 10),
+    ("master", "Мастер слова", "Изучите 50 идиом", 50),
+    ("thinker", "Мыслитель", "Оставьте 5 рефлексий", 5),
+]
+
+IDIOMS_SEED = [
+    ("Бить баклуши", "To twiddle one's thumbs", "Бездельничать, ничего не делать",
+     "Хватит бить баклуши — пора за работу!", "лень"),
+    ("Водить за нос", "To lead someone up the garden path", "Обманывать, вводить в заблуждение",
+     "Он месяц водил нас за нос обещаниями.", "обман"),
+    ("Сесть в лужу", "To put one's foot in it", "Оказаться в неловком положении",
+     "С этим прогнозом он сел в лужу.", "неудача"),
+    ("Зарубить на носу", "To get something into one's head", "Крепко запомнить",
+     "Заруби себе на носу: без билета не пустят.", "память"),
+    ("Как рыба в воде", "Like a duck to water", "Чувствовать себя уверенно и свободно",
+     "В новой команде она как рыба в воде.", "уверенность"),
+    ("Тянуть кота за хвост", "To beat around the bush", "Медлить, затягивать дело",
+     "Не тяни кота за хвост, отвечай прямо.", "лень"),
+    ("Выйти сухим из воды", "To get off scot-free", "Избежать наказания",
+     "Ему снова удалось выйти сухим из воды.", "удача"),
+    ("Держать язык за зубами", "To keep one's mouth shut", "Молчать, хранить секрет",
+     "Об этом плане держи язык за зубами.", "молчание"),
+]
+
+
+class Database:
+    """Обёртка над PostgreSQL. Создаёт схему и сид-данные при запуске."""
+
+    def __init__(self, dsn=None):
+        self.dsn = dsn or os.getenv("DATABASE_URL", "dbname=logosphera")
+        # Пул вместо connect() на каждый вызов: короткие запросы раньше
+        # платили за TCP, auth и fork бэкенда Postgres больше, чем за
+        # саму работу.
+        self._schema_ready = False
+        self._pool = ThreadedConnectionPool(
+            1,
+            int(os.getenv("DB_POOL_MAX", "10")),
+            self.dsn,
+            cursor_factory=RealDictCursor,
+        )
+        # Медленно меняющиеся выборки держим в памяти: счётчик цитат —
+        # минуту, списки идиом (контент фиксирован) — пять.
+        self._count_cache = cachetools.TTLCache(maxsize=4, ttl=60)
+        self._idiom_cache = cachetools.TTLCache(maxsize=32, ttl=300)
+        # Незавершённые id идиом по пользователям — для get_random_idiom.
+        self._candidate_ids = cachetools.LRUCache(maxsize=10_000)
+        self._bootstrap()
+        # PREPARE ссылается на таблицы, поэтому включается только после
+        # создания схемы.
+        self._schema_ready = True
+
+    @contextmanager
+    def _conn(self):
+        conn = self._pool.getconn()
+        try:
+            if self._schema_ready and not getattr(conn, "_stmts_ready", False):
+                with conn.cursor() as cur:
+                    cur.execute(_PREPARE_SCRIPT)
+                conn.commit()
+                conn._stmts_ready = True
+            yield conn
+        finally:
+            # Читающие методы не коммитят — откатываем, чтобы не вернуть
+            # в пул соединение с висящей idle-in-transaction транзакцией.
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+            self._pool.putconn(conn)
+
+    # --- схема и сид-данные ---
+
+    def _bootstrap(self):
+        """Создаёт схему и сид-данные ровно один раз на кластер.
+
+        Раньше каждый Database() безусловно слал всю DDL-пачку и сиды —
+        лишний десяток round trip'ов на каждый холодный старт воркера.
+        Теперь бутстрап берёт advisory lock; проигравшие воркеры ждут
+        на нём, пока победитель не создаст схему (иначе они вернулись бы
+        сразу и завалили PREPARE на недосозданных таблицах), а при уже
+        существующей схеме всё сводится к одному дешёвому SELECT.
+        """
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_BOOTSTRAP_LOCK,))
+            try:
+                cur.execute("SELECT to_regclass('users') AS t")
+                if cur.fetchone()["t"] is None:
+                    self._init_db()
+                    self._init_achievements()
+                    self._init_idioms()
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_BOOTSTRAP_LOCK,))
+                conn.commit()
+
+    def _init_db(self):
+        with self._conn() as conn, conn.cursor() as cur:
+            # Все CREATE TABLE уходят одним многооператорным запросом —
+            # psycopg2 шлёт скрипт целиком, вместо round trip'а на таблицу.
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    telegram_id BIGINT UNIQUE NOT NULL,
+                    username TEXT,
+                    created_at TIMESTAMP DEFAULT NOW()
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS idioms (
+                    id SERIAL PRIMARY KEY,
+                    text_ru TEXT NOT NULL,
+                    text_en TEXT NOT NULL,
+                    meaning TEXT NOT NULL,
+                    example TEXT,
+                    topic TEXT
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS user_progress (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id),
+                    idiom_id INTEGER REFERENCES idioms(id),
+                    status TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    UNIQUE (user_id, idiom_id)
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS achievements (
+                    id SERIAL PRIMARY KEY,
+                    code TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    threshold INTEGER NOT NULL
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS user_achievements (
+                    user_id INTEGER REFERENCES users(id),
+                    achievement_id INTEGER REFERENCES achievements(id),
+                    earned_at TIMESTAMP DEFAULT NOW(),
+                    UNIQUE (user_id, achievement_id)
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS reflections (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id),
+                    idiom_id INTEGER REFERENCES idioms(id),
+                    text TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT NOW()
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS user_state (
+                    user_id BIGINT PRIMARY KEY,
+                    blob BYTEA NOT NULL,
+                    updated_at TIMESTAMP DEFAULT NOW()
+                )
+                ;
+                CREATE TABLE IF NOT EXISTS quotations (
+                    id SERIAL PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    author TEXT,
+                    source TEXT,
+                    is_validated BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT NOW()
+                )
+            """)
+            # Индексы под горячие запросы; частичные — чтобы держать их
+            # минимальными: прогресс читается только по completed, цитаты
+            # — только провалидированные, свежие первыми.
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS ix_up_user_completed
+                ON user_progress (user_id) WHERE status = 'completed'
+                ;
+                CREATE INDEX IF NOT EXISTS ix_ua_user
+                ON user_achievements (user_id)
+                ;
+                CREATE INDEX IF NOT EXISTS ix_idioms_topic ON idioms (topic)
+                ;
+                CREATE INDEX IF NOT EXISTS ix_quotations_validated_created
+                ON quotations (created_at DESC) WHERE is_validated
+                ;
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_quotations_text_md5
+                ON quotations ((md5(text)))
+            """)
+            # Вся DDL — два батча в одной транзакции: один round trip на
+            # таблицы, один на индексы, один commit.
+            conn.commit()
+
+    def _init_achievements(self):
+        # Один батч вместо round trip'а на каждую строку сид-данных.
+        with self._conn() as conn, conn.cursor() as cur:
+            execute_values(
+                cur,
+                """
+                INSERT INTO achievements (code, title, description, threshold)
+                VALUES %s ON CONFLICT (code) DO NOTHING
+                """,
+                ACHIEVEMENTS_SEED,
+                page_size=100,
+            )
+            conn.commit()
+
+    def _init_idioms(self):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS n FROM idioms")
+            if cur.fetchone()["n"] == 0:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO idioms (text_ru, text_en, meaning, example, topic)
+                    VALUES %s
+                    """,
+                    IDIOMS_SEED,
+                    page_size=100,
+                )
+                conn.commit()
+
+    # --- пользователи ---
+
+    def get_or_create_user(self, telegram_id, username=None):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["user_by_tid"], (telegram_id,))
+            user = cur.fetchone()
+            if user is None:
+                cur.execute(SQL["user_insert"], (telegram_id, username))
+                user = cur.fetchone()
+                conn.commit()
+            elif username and user["username"] != username:
+                cur.execute(SQL["user_set_name"], (username, user["id"]))
+                conn.commit()
+                user["username"] = username
+        return user
+
+    # --- идиомы ---
+
+    def get_idioms_by_topic(self, topic=None):
+        """Все идиомы, при необходимости отфильтрованные по теме."""
+        cached = self._idiom_cache.get(topic)
+        if cached is not None:
+            return list(cached)
+        with self._conn() as conn, conn.cursor() as cur:
+            if topic:
+                cur.execute(SQL["idioms_by_topic"], (topic,))
+            else:
+                cur.execute(SQL["idioms_all"])
+            rows = cur.fetchall()
+        self._idiom_cache[topic] = rows
+        return list(rows)
+
+    def get_idiom_by_id(self, idiom_id):
+        """Точечная выборка идиомы по первичному ключу."""
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["idiom_by_id"], (idiom_id,))
+            row = cur.fetchone()
+        return row
+
+    def get_random_idiom(self, user_id):
+        """Случайная идиома, которую пользователь ещё не завершил.
+
+        Список незавершённых id считается в БД один раз на пользователя
+        и дальше живёт в памяти: повторные нажатия «случайная идиома»
+        в рамках сессии обходятся random.choice без анти-джойна.
+        Кэш сбрасывается при завершении идиомы в update_user_progress.
+        """
+        candidates = self._candidate_ids.get(user_id)
+        if candidates is None:
+            with self._conn() as conn, conn.cursor() as cur:
+                cur.execute(SQL["candidate_ids"], (user_id,))
+                candidates = [row["id"] for row in cur.fetchall()]
+            self._candidate_ids[user_id] = candidates
+        if not candidates:
+            return None
+        return self.get_idiom_by_id(random.choice(candidates))
+
+    # --- прогресс и достижения ---
+
+    def update_user_progress(self, user_id, idiom_id, status):
+        """Записывает прогресс и тут же выдаёт достижения — один запрос."""
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["progress_upsert"], (user_id, idiom_id, status))
+            conn.commit()
+        # Набор кандидатов меняет только завершение: in_progress пишется
+        # сразу после каждой выдачи, и безусловный сброс делал бы кэш
+        # бесполезным — анти-джойн выполнялся бы на каждое нажатие.
+        if status == "completed":
+            self._candidate_ids.pop(user_id, None)
+
+    def get_user_achievements(self, user_id):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["achievements_list"], (user_id,))
+            rows = cur.fetchall()
+        return rows
+
+    def get_user_dashboard(self, user_id):
+        """Прогресс, достижения и счётчик рефлексий одним соединением.
+
+        Экраны статистики и достижений раньше делали по два-три отдельных
+        похода в БД; здесь те же SELECT'ы выполняются на одном курсоре.
+        """
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["progress_counts"], (user_id,))
+            progress = cur.fetchone()
+            cur.execute(SQL["achievements_list"], (user_id,))
+            achievements = cur.fetchall()
+            cur.execute(SQL["reflection_count"], (user_id,))
+            reflections = cur.fetchone()
+        return progress, achievements, reflections
+
+    # --- рефлексии ---
+
+    def save_reflection(self, user_id, idiom_id, text):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["reflection_insert"], (user_id, idiom_id, text))
+            conn.commit()
+
+    def get_reflection_stats(self, user_id):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["reflection_count"], (user_id,))
+            row = cur.fetchone()
+        return row
+
+    # --- состояние диалога (msgpack-блоб, переживает рестарты) ---
+
+    def save_state(self, user_id, blob):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["state_upsert"], (user_id, psycopg2.Binary(blob)))
+            conn.commit()
+
+    def load_state(self, user_id):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["state_get"], (user_id,))
+            row = cur.fetchone()
+        return bytes(row["blob"]) if row else None
+
+    def delete_state(self, user_id):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["state_delete"], (user_id,))
+            conn.commit()
+
+    # --- цитаты ---
+
+    def get_quotation_count(self):
+        cached = self._count_cache.get("validated")
+        if cached is not None:
+            return cached
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["quotation_count"])
+            n = cur.fetchone()["n"]
+        self._count_cache["validated"] = n
+        return n
+
+    def get_quotations(self, limit=100):
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute(SQL["quotations_page"], (limit,))
+            rows = cur.fetchall()
+        return rows
+
+    def iter_quotations(self, batch_size=500):
+        """Ленивый обход всех провалидированных цитат.
+
+        Именованный (серверный) курсор держит результат на стороне
+        Postgres и передаёт его порциями itersize; в памяти процесса
+        в каждый момент не больше одного батча, а потребитель получает
+        словари по одному.
+        """
+        with self._conn() as conn:
+            with conn.cursor(name="quotations_stream") as cur:
+                cur.itersize = batch_size
+                cur.execute(SQL["quotations_all"])
+                # RealDictRow — уже словарь, копия на каждую строку не нужна
+                yield from cur
+
+    def save_quotations(self, quotes):
+        """Сохраняет список цитат вида {"text": ..., "author": ..., "source": ...}.
+
+        Один батч execute_values вместо сериализации в JSON и обратно
+        плюс INSERT с коммитом на каждую строку.
+        """
+        if not quotes:
+            return
+        rows = [(q["text"], q.get("author"), q.get("source")) for q in quotes]
+        with self._conn() as conn, conn.cursor() as cur:
+            # Дедупликацию делает сервер по уникальному индексу md5(text):
+            # без round trip'а с SELECT на строку и без гонок между
+            # параллельными писателями.
+            execute_values(
+                cur,
+                """
+                INSERT INTO quotations (text, author, source) VALUES %s
+                ON CONFLICT ((md5(text))) DO NOTHING
+                """,
+                rows,
+                page_size=500,
+            )
+            conn.commit()
+        self._count_cache.clear()
+
+    def copy_quotations(self, quotes):
+        """Массовая загрузка цитат через COPY, с дедупликацией по тексту.
+
+        На больших партиях COPY в разы быстрее пачек INSERT: парсер и
+        планировщик отрабатывают один раз на весь поток. Данные идут в
+        temp-таблицу, оттуда одним INSERT ... SELECT переносятся только
+        строки, текста которых в quotations ещё нет. Принимает любой
+        итерируемый источник, загружает кусками. Возвращает число
+        добавленных строк.
+        """
+        inserted = 0
+        with self._conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE quotations_stage
+                (text TEXT, author TEXT, source TEXT)
+                ON COMMIT DROP
+            """)
+            buf = io.StringIO()
+            writer = csv.writer(buf, delimiter="\t")
+            for n, quote in enumerate(quotes, start=1):
+                writer.writerow(
+                    (quote["text"], quote.get("author"), quote.get("source"))
+                )
+                if n % 5000 == 0:
+                    buf.seek(0)
+                    cur.copy_expert(_COPY_STAGE_SQL, buf)
+                    buf = io.StringIO()
+                    writer = csv.writer(buf, delimiter="\t")
+            if buf.tell():
+                buf.seek(0)
+                cur.copy_expert(_COPY_STAGE_SQL, buf)
+            # ON CONFLICT по индексу md5(text) отсекает и уже имеющиеся в
+            # таблице тексты, и дубликаты внутри самой партии.
+            cur.execute("""
+                INSERT INTO quotations (text, author, source)
+                SELECT s.text, s.author, s.source FROM quotations_stage s
+                ON CONFLICT ((md5(text))) DO NOTHING
+            """)
+            inserted = cur.rowcount
+            conn.commit()
+        self._count_cache.clear()
+        return inserted
@@ -0,0 +1,42 @@
+"""Приветствия и главное меню бота."""
+
+import functools
+import random
+
+from telegram import InlineKeyboardButton
+
+# Кортеж, а не список: random.choice по нему так же быстр,
+# а случайно замутировать константу нельзя.
+GREETINGS = (
+    "Привет! Я Логосфера — бот про идиомы и цитаты на двух языках.",
+    "Здравствуйте! Готовы узнать новую идиому?",
+    "Добро пожаловать в Логосферу! Учимся и развлекаемся.",
+    "Привет! Давайте прокачаем ваш язык — и русский, и английский.",
+)
+
+
+def get_greeting():
+    """Случайное приветствие для /start.
+
+    Выбор случайный, поэтому сам результат не кэшируется — кэшировать
+    здесь нечего, шаблоны и так лежат в константе.
+    """
+    return random.choice(GREETINGS)
+
+
+@functools.lru_cache(maxsize=1)
+def get_menu_keyboard():
+    """Главное меню: список рядов готовых InlineKeyboardButton.
+
+    Содержимое детерминированное, поэтому кнопки строятся один раз —
+    PTB больше не пересобирает их из сырых словарей при каждой отправке.
+    """
+    return [
+        [InlineKeyboardButton("📖 Случайная идиома", callback_data="random_idiom")],
+        [InlineKeyboardButton("🎯 Практика", callback_data="practice")],
+        [
+            InlineKeyboardButton("🏆 Достижения", callback_data="achievements"),
+            InlineKeyboardButton("📊 Статистика", callback_data="stats"),
+        ],
+        [InlineKeyboardButton("💭 Рефлексия", callback_data="reflection")],
+    ]
@@ -0,0 +1,132 @@
+"""Сборщик цитат с citaty.info.
+
+Обходит страницы со случайными цитатами, чистит текст, отбрасывает
+мусор (адреса, даты, театральные ремарки, просто не-цитаты) и передаёт
+результат в Database.save_quotations.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from bs4 import BeautifulSoup
+
+from database import Database
+from harvest_utils import RateLimiter, add_unique
+from quote_filters import is_valid_quotation
+
+try:  # C-парсер lxml в разы быстрее html.parser на больших страницах
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://citaty.info/random"
+DELAY = 5.0  # суммарный темп запросов к сайту остаётся прежним
+WORKERS = 4
+
+# Селектор классов для find_all — один раз, а не на каждую страницу
+_CLASS_QUOTE_RE = re.compile(r"quote|text")
+
+
+def clean_text(text):
+    """Убирает лишние пробелы и обрамляющие кавычки.
+
+    split/join и strip — C-уровневые операции; оба прежних regex
+    (\\s+ и классы кавычек) на этой задаче были избыточны.
+    """
+    return " ".join(text.split()).strip('«»"„“”\' ')
+
+
+_rate_limiter = RateLimiter(DELAY)
+
+
+# Одна сессия на процесс: keep-alive вместо нового TCP+TLS рукопожатия
+# на каждую страницу; размер пула соединений совпадает с числом воркеров.
+_session = requests.Session()
+_session.headers["User-Agent"] = "tgBot-Logosphera/1.0"
+_session.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=WORKERS, pool_maxsize=WORKERS),
+)
+
+_HOST = urlsplit(BASE_URL).hostname
+# Решение «проверять ли сертификат» запоминается на хост: после первой
+# SSL-ошибки остальные страницы не платят за заведомо провальное
+# рукопожатие с verify=True.
+_verify_by_host = {}
+
+
+def fetch_page(page):
+    _rate_limiter.acquire()
+    url = f"{BASE_URL}?page={page}"
+    verify = _verify_by_host.get(_HOST, True)
+    try:
+        response = _session.get(url, timeout=15, verify=verify)
+    except requests.exceptions.SSLError:
+        if not verify:
+            raise
+        _verify_by_host[_HOST] = False
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        logger.warning("Сертификат %s не прошёл проверку — дальше без verify", _HOST)
+        response = _session.get(url, timeout=15, verify=False)
+    response.raise_for_status()
+    # Байты вместо .text: декодированием занимается сам парсер,
+    # без лишней str-аллокации на каждую страницу.
+    return response.content
+
+
+def parse_quotes(html):
+    soup = BeautifulSoup(html, PARSER)
+    quotes = []
+    for block in soup.find_all("div", class_=_CLASS_QUOTE_RE):
+        text = clean_text(block.get_text())
+        if not is_valid_quotation(text):
+            continue
+        # Поиск внутри самого блока, а не find_next по всему документу:
+        # O(дети блока) вместо O(остаток дерева) на каждую цитату, и
+        # автор соседней цитаты не может приписаться к текущей.
+        author_elem = block.find("a", class_="author")
+        quotes.append({
+            "text": text,
+            "author": author_elem.get_text(strip=True) if author_elem else None,
+            "source": "citaty.info",
+        })
+    return quotes
+
+
+def harvest(max_pages=50):
+    quotes = []
+    seen = set()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {
+            pool.submit(fetch_page, page): page
+            for page in range(1, max_pages + 1)
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                html = future.result()
+            except requests.RequestException as exc:
+                logger.warning("Страница %s не получена: %s", page, exc)
+                continue
+            added = add_unique(quotes, parse_quotes(html), seen)
+            logger.info("Страница %s: %s новых цитат", page, added)
+    return quotes
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    quotes = harvest()
+    logger.info("Собрано %s цитат", len(quotes))
+    db = Database()
+    db.save_quotations(quotes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Сборщик англоязычных цитат с Goodreads.
+
+Обходит страницы /quotes, чистит текст, отбрасывает мусор (даты, адреса,
+ссылки, просто не-цитаты) и складывает результат в JSON-файл для
+последующего импорта в базу.
+"""
+
+import logging
+import os
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+
+import orjson
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from harvest_utils import RateLimiter, add_unique
+from quote_filters import is_valid_quotation
+
+try:  # C-парсер lxml в разы быстрее html.parser на больших страницах
+    import lxml.html
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+try:  # cssselect — отдельный пакет; без него lxml остаётся парсером BS4
+    from lxml.cssselect import CSSSelector
+    # CSS→XPath транслируется один раз при импорте, не на каждую страницу
+    _QUOTE_SEL = CSSSelector("div.quoteText")
+    _AUTHOR_SEL = CSSSelector("span.authorOrTitle")
+except ImportError:
+    _QUOTE_SEL = None
+
+try:  # selectolax (lexbor) ещё быстрее на чисто CSS-селекторной работе
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+logger = logging.getLogger(__name__)
+
+# BS4-путь строит дерево только из блоков цитат: навигация, скрипты и
+# сайдбары страницы не материализуются в Python-объекты вообще.
+_ONLY_QUOTES = SoupStrainer("div", class_="quoteText")
+
+BASE_URL = "https://www.goodreads.com/quotes"
+DELAY = 10  # суммарный темп запросов к сайту остаётся прежним
+WORKERS = 2
+MAX_RETRIES = 3
+# С какого объёма выносить парсинг в отдельные процессы: на коротких
+# прогонах цена старта пула и pickle выше выигрыша от обхода GIL.
+PARSE_IN_PROCESSES_FROM = 20
+OUTPUT_FILE = "goodreads_quotes.json"
+
+headers = {"User-Agent": "tgBot-Logosphera/1.0"}
+
+def clean_text(text):
+    """Убирает лишние пробелы и обрамляющие кавычки."""
+    text = " ".join(text.split())
+    return text.strip('"“” ')
+
+
+_rate_limiter = RateLimiter(DELAY)
+
+# Одна сессия на процесс: keep-alive вместо нового TCP+TLS рукопожатия
+# на каждую страницу; размер пула соединений совпадает с числом воркеров.
+# Ретраи с экспоненциальным backoff живут в urllib3, а не в ручной
+# лестнице try/except: меньше Python-кадров на запрос, и Retry-After
+# от сервера учитывается автоматически.
+_session = requests.Session()
+_session.headers.update(headers)
+_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=WORKERS,
+        pool_maxsize=WORKERS,
+        max_retries=Retry(
+            total=MAX_RETRIES,
+            backoff_factor=2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        ),
+    ),
+)
+
+
+def fetch_page(page):
+    url = f"{BASE_URL}?page={page}"
+    _rate_limiter.acquire()
+    try:
+        # Байты вместо .text: декодированием занимается сам парсер,
+        # без лишней str-аллокации; with возвращает соединение в пул
+        # сразу, не дожидаясь сборщика мусора.
+        with _session.get(url, timeout=60) as response:
+            response.raise_for_status()
+            return response.content
+    except requests.RequestException as exc:
+        logger.warning("Страница %s не получена: %s", page, exc)
+        return None
+
+
+def parse_quotes(html):
+    # Нужны только .quoteText и span.authorOrTitle — чисто селекторная
+    # работа, на которой selectolax не строит Python-объект на каждый
+    # узел дерева. Без selectolax деревом занимается lxml напрямую, без
+    # Python-обёрток BS4; сам BS4 остаётся последним запасным путём.
+    if SelectolaxParser is not None:
+        return _parse_quotes_selectolax(html)
+    if _QUOTE_SEL is not None:
+        return _parse_quotes_lxml(html)
+    return _parse_quotes_bs4(html)
+
+
+def _parse_quotes_selectolax(html):
+    tree = SelectolaxParser(html)
+    quotes = []
+    for node in tree.css(".quoteText"):
+        text = clean_text(node.text(separator=" ", strip=True))
+        if not is_valid_quotation(text, lang="en"):
+            continue
+        # Автор ищется внутри самого блока цитаты, а не по всему
+        # документу вперёд — заодно исключает чужих авторов.
+        author_node = node.css_first("span.authorOrTitle")
+        quotes.append({
+            "text": text,
+            "author": author_node.text(strip=True) if author_node else None,
+            "source": "goodreads",
+        })
+    return quotes
+
+
+def _parse_quotes_lxml(html):
+    doc = lxml.html.fromstring(html)
+    quotes = []
+    for node in _QUOTE_SEL(doc):
+        text = clean_text(node.text_content())
+        if not is_valid_quotation(text, lang="en"):
+            continue
+        author_nodes = _AUTHOR_SEL(node)
+        quotes.append({
+            "text": text,
+            "author": author_nodes[0].text_content().strip() if author_nodes else None,
+            "source": "goodreads",
+        })
+    return quotes
+
+
+def _parse_quotes_bs4(html):
+    soup = BeautifulSoup(html, PARSER, parse_only=_ONLY_QUOTES)
+    quotes = []
+    for block in soup.find_all("div", class_="quoteText"):
+        text = clean_text(block.find(string=True) or "")
+        if not is_valid_quotation(text, lang="en"):
+            continue
+        author_elem = block.find("span", class_="authorOrTitle")
+        quotes.append({
+            "text": text,
+            "author": author_elem.get_text(strip=True) if author_elem else None,
+            "source": "goodreads",
+        })
+    return quotes
+
+
+def harvest(max_pages=30):
+    # На больших прогонах HTML парсится в пуле процессов: парсинг —
+    # CPU-часть работы, и отдельные процессы обходят GIL, перекрывая
+    # разбор уже скачанных страниц со скачиванием следующих. В пул
+    # уходят bytes, обратно — список словарей: pickle на этом дёшев.
+    parse_pool = None
+    if max_pages >= PARSE_IN_PROCESSES_FROM:
+        parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    quotes = []
+    seen = set()
+    try:
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            futures = {
+                pool.submit(fetch_page, page): page
+                for page in range(1, max_pages + 1)
+            }
+            parse_futures = []
+            for future in as_completed(futures):
+                page = futures[future]
+                html = future.result()
+                if not html:
+                    continue
+                if parse_pool is not None:
+                    parse_futures.append(
+                        (page, parse_pool.submit(parse_quotes, html))
+                    )
+                    continue
+                added = add_unique(quotes, parse_quotes(html), seen)
+                logger.info("Страница %s: %s новых цитат", page, added)
+            for page, parse_future in parse_futures:
+                added = add_unique(quotes, parse_future.result(), seen)
+                logger.info("Страница %s: %s новых цитат", page, added)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+    return quotes
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    quotes = harvest()
+    logger.info("Собрано %s цитат", len(quotes))
+    # orjson пишет UTF-8 байты напрямую — без посимвольного
+    # экранирования и Python-уровневой кодировки stdlib json
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(quotes, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
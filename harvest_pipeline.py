@@ -0,0 +1,309 @@
+"""Оркестратор конвейера сбора цитат.
+
+Три стадии: запуск всех harvest_*-скриптов, слияние их JSON-выводов в
+ALL_QUOTES.json и импорт результата в PostgreSQL. Запускается руками
+или по крону; каждая стадия пишет статистику в self.stats.
+"""
+
+import functools
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import orjson
+
+from database import Database
+
+try:  # потоковый парсер: импорт не держит весь ALL_QUOTES.json в памяти
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_TIMEOUT = 3600  # час на один сборщик
+MERGED_FILE = "ALL_QUOTES.json"
+SUMMARY_FILE = "pipeline_summary.json"
+
+# Имена JSON-файлов, которые пишут сборщики (скрипт -> файл выводится
+# из имени: harvest_X.py -> X.json... кроме citaty, который пишет в БД
+# напрямую и в слиянии не участвует).
+HARVEST_OUTPUTS = {
+    "harvest_anecdot_ru.py": "anecdot_ru.json",
+    "harvest_goodreads.py": "goodreads_quotes.json",
+    "harvest_wikiquote_ru.py": "wikiquote_ru.json",
+    "harvest_zenquotes.py": "zenquotes.json",
+}
+
+acceptable_errors = [
+    "403", "404", "timeout", "refused", "blocked", "rate limit",
+    "too many requests", "connection reset", "temporarily unavailable",
+    "ssl", "certificate", "unreachable", "name resolution",
+]
+
+# Паттерны компилируются один раз при импорте, а не на каждый вызов:
+# extract_quotes_count/extract_errors зовутся на вывод каждого
+# сборщика, и шесть re.finditer по отдельности означали шесть полных
+# проходов по буферу. Одна альтернация — один проход.
+_QCOUNT_RE = re.compile(
+    r"(?:Собрано|Добавлено|Всего) (\d+) цитат"
+    r"|(?:Collected|Saved) (\d+) quotes"
+    r"|(\d+) цитат сохранено",
+    re.IGNORECASE,
+)
+# Быстрый путь: односложные маркеры терпимых ошибок проверяются
+# пересечением хэш-множеств по токенам строки — одна операция вместо
+# сканирования альтернацией. Альтернация остаётся запасным путём для
+# многословных маркеров и токенов со знаками препинания; строка
+# приводится к нижнему регистру один раз, поэтому IGNORECASE не нужен.
+_ACCEPTABLE_TOKENS = frozenset(e for e in acceptable_errors if " " not in e)
+_ACCEPTABLE_RE = re.compile("|".join(map(re.escape, acceptable_errors)))
+# Строки с ошибками ищутся одним multiline-проходом по буферу вместо
+# split по переводам строк (который материализует список всех строк
+# вывода) и проверки каждой по отдельности.
+_ERROR_LINE_RE = re.compile(r"^.*(?:error|warning).*$", re.IGNORECASE | re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_acceptable(lowered):
+    """Вердикт по уже приведённой к нижнему регистру строке.
+
+    Сборщики печатают одни и те же ошибки десятками (повторные 403 или
+    таймауты по страницам) — кэш отвечает на повторы без токенизации
+    и поиска по альтернации.
+    """
+    if not _ACCEPTABLE_TOKENS.isdisjoint(lowered.split()):
+        return True
+    return _ACCEPTABLE_RE.search(lowered) is not None
+
+
+class HarvestPipeline:
+    """Последовательность стадий harvest → merge → import."""
+
+    def __init__(self):
+        self.db = Database()
+        self.stats = {"harvest": {}, "merge": {}, "import": {}}
+        # Скрипты с одинаковым префиксом бьют в один сайт — их нельзя
+        # пускать одновременно, остальные друг другу не мешают.
+        self._domain_locks = defaultdict(threading.Lock)
+        # Пауза между запусками сборщиков: 0 пока источники здоровы,
+        # растёт экспоненциально (5 -> 60 с), как только в выводе
+        # появляются признаки rate-limit/блокировки, и сбрасывается
+        # первым же чистым прогоном.
+        self._backoff = 0
+
+    # --- стадия 1: сбор ---
+
+    def find_harvest_scripts(self):
+        # scandir отдаёт тип файла вместе с именем из одного системного
+        # вызова — без fnmatch-прохода glob и отдельного stat на каждый
+        # кандидат, которые делала связка glob + os.path.isfile.
+        scripts = []
+        with os.scandir(".") as entries:
+            for entry in entries:
+                name = entry.name
+                if (name.startswith("harvest_") and name.endswith(".py")
+                        and name not in ("harvest_pipeline.py", "harvest_utils.py")
+                        and entry.is_file(follow_symlinks=False)):
+                    scripts.append(name)
+        return sorted(scripts)
+
+    def run_harvest_script(self, script_path):
+        """Запускает один сборщик, возвращает (ok, quotes_count, errors).
+
+        Вывод читается построчно и сразу уходит в логгер; для анализа
+        держится только кольцевой буфер последних строк, а не весь
+        stdout целиком — болтливый сборщик мог накопить сотни мегабайт
+        в памяти родителя до первого взгляда на них.
+        """
+        script_name = os.path.basename(script_path)
+        domain = script_name.removeprefix("harvest_").split("_")[0]
+        self._domain_locks[domain].acquire()
+        # Пауза берётся прямо перед запуском, когда завершившиеся к
+        # этому моменту сборщики уже успели её выставить: платим
+        # задержкой только когда среда этого требует.
+        if self._backoff:
+            time.sleep(self._backoff)
+        logger.info("Запуск %s...", script_name)
+        proc = subprocess.Popen(
+            [sys.executable, script_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            encoding="utf-8",
+            errors="replace",
+        )
+        tail = deque(maxlen=2000)
+        # Гейт снаружи цикла: при выключенном DEBUG вывод сборщика не
+        # платит за вызов logger.debug на каждую строку.
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+        # stdout вычитывает отдельный поток: читающий цикл в основном
+        # потоке блокировался бы без дедлайна, и wait(timeout) дошёл бы
+        # до дела только после EOF — зависший сборщик стопорил стадию
+        # навсегда. Здесь таймаут меряется по настенным часам wait'ом,
+        # а зависший процесс убивается, что закрывает pipe и читателя.
+        def _drain():
+            for line in proc.stdout:
+                line = line.rstrip("\n")
+                tail.append(line)
+                if debug_enabled:
+                    logger.debug("%s: %s", script_name, line)
+
+        reader = threading.Thread(target=_drain, daemon=True)
+        reader.start()
+        try:
+            returncode = proc.wait(timeout=SCRIPT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            reader.join()
+            logger.error("✗ %s не уложился в таймаут", script_name)
+            self._backoff = min(60, self._backoff * 2 or 5)
+            return False, -1, ["timeout"]
+        finally:
+            self._domain_locks[domain].release()
+        reader.join()
+        output = "\n".join(tail)
+        quotes_count = self.extract_quotes_count(output)
+        errors = self.extract_errors(output)
+        # Терпимые ошибки (403/429/таймауты) — сигнал сбавить темп для
+        # следующих запусков; поиск по хвосту без lru-кэша, чтобы не
+        # складывать туда многокилобайтные буферы.
+        if _ACCEPTABLE_RE.search(output.lower()):
+            self._backoff = min(60, self._backoff * 2 or 5)
+        else:
+            self._backoff = 0
+        if returncode != 0:
+            logger.error("✗ %s завершился с ошибкой:\n%s", script_name, output[:500])
+            return False, quotes_count, errors
+        logger.info("✓ %s: %s цитат", script_name, quotes_count)
+        return True, quotes_count, errors
+
+    def extract_quotes_count(self, output):
+        """Ищет в выводе сборщика итоговое число собранных цитат."""
+        count = -1
+        for match in _QCOUNT_RE.finditer(output):
+            count = int(next(g for g in match.groups() if g is not None))
+        return count
+
+    def extract_errors(self, output):
+        """Строки с ошибками/предупреждениями, кроме заведомо терпимых."""
+        errors = []
+        for match in _ERROR_LINE_RE.finditer(output):
+            line = match.group()
+            if not self.is_harvest_error_acceptable(line):
+                errors.append(line.strip())
+                if len(errors) >= 10:
+                    break
+        return errors
+
+    def is_harvest_error_acceptable(self, error_output):
+        """Сетевые отказы источников — норма, конвейер они не валят."""
+        return _is_acceptable(error_output.lower())
+
+    def run_harvest_stage(self):
+        scripts = self.find_harvest_scripts()
+        logger.info("Найдено %s сборщиков", len(scripts))
+        if not scripts:
+            return
+        # Сборщики независимы (каждый бьёт в свой сайт), поэтому стадия
+        # длится max(время скрипта), а не сумму; однодоменные скрипты
+        # сериализует _domain_locks.
+        with ThreadPoolExecutor(max_workers=min(8, len(scripts))) as pool:
+            futures = {
+                pool.submit(self.run_harvest_script, script): script
+                for script in scripts
+            }
+            for future in as_completed(futures):
+                script = futures[future]
+                ok, count, errors = future.result()
+                self.stats["harvest"][script] = {
+                    "ok": ok, "quotes": count, "errors": errors,
+                }
+
+    # --- стадия 2: слияние ---
+
+    def run_merge_stage(self):
+        merged = []
+        for script, output_file in HARVEST_OUTPUTS.items():
+            if not os.path.exists(output_file):
+                logger.warning("Нет файла %s — %s пропускается", output_file, script)
+                continue
+            with open(output_file, "rb") as f:
+                quotes = orjson.loads(f.read())
+            merged.extend(quotes)
+            logger.info("%s: %s цитат в слияние", output_file, len(quotes))
+        # orjson пишет объединённый корпус на порядок быстрее stdlib-json
+        with open(MERGED_FILE, "wb") as f:
+            f.write(orjson.dumps(merged, option=orjson.OPT_INDENT_2))
+        self.stats["merge"] = {"total": len(merged)}
+        logger.info("Слито %s цитат в %s", len(merged), MERGED_FILE)
+
+    # --- стадия 3: импорт ---
+
+    def run_import_stage(self):
+        if not os.path.exists(MERGED_FILE):
+            logger.warning("%s не найден — импорт пропущен", MERGED_FILE)
+            return
+        # Крупные файлы идут потоком ijson в COPY: память O(1) вместо
+        # O(N), первая строка попадает в Postgres до конца парсинга.
+        # Порог по размеру файла, чтобы не материализовывать список
+        # только ради len(); мелкие файлы — обычным батчем.
+        if ijson is not None and os.path.getsize(MERGED_FILE) > 64 * 1024:
+            with open(MERGED_FILE, "rb") as f:
+                imported = self.db.copy_quotations(ijson.items(f, "item"))
+        else:
+            with open(MERGED_FILE, "rb") as f:
+                quotes = orjson.loads(f.read())
+            if len(quotes) > 100:
+                imported = self.db.copy_quotations(quotes)
+            else:
+                self.db.save_quotations(quotes)
+                imported = len(quotes)
+        self.stats["import"] = {"imported": imported}
+        logger.info("Импортировано %s цитат в PostgreSQL", imported)
+
+    # --- запуск ---
+
+    def run(self):
+        started = time.monotonic()
+        self.run_harvest_stage()
+        self.run_merge_stage()
+        self.run_import_stage()
+        elapsed = time.monotonic() - started
+        # Итоги — одним orjson-документом: файл для мониторинга и одна
+        # запись в лог вместо десятка отдельных вызовов logger.info
+        # (каждый — свой LogRecord, форматирование и проходы по хендлерам).
+        summary = {
+            "harvest": self.stats["harvest"],
+            "merged": self.stats["merge"].get("total", 0),
+            "imported": self.stats["import"].get("imported", 0),
+            "elapsed_sec": round(elapsed, 1),
+        }
+        with open(SUMMARY_FILE, "wb") as f:
+            f.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+        logger.info("Итоги конвейера: %s", orjson.dumps(summary).decode())
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        handlers=[
+            logging.StreamHandler(),
+            # delay=True: файл не создаётся, пока не появится первая запись
+            logging.FileHandler("harvest_pipeline.log", encoding="utf-8", delay=True),
+        ],
+    )
+    HarvestPipeline().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Общие помощники для сборщиков цитат."""
+
+import hashlib
+import threading
+import time
+
+
+def add_unique(quotes, page_quotes, seen):
+    """Добавляет в quotes цитаты, текст которых ещё не встречался.
+
+    Популярные цитаты повторяются на многих страницах; набор 8-байтовых
+    blake2b-дайджестов даёт O(1) проверку на дубликат по ходу сбора
+    (стабильную между процессами, в отличие от встроенного hash) вместо
+    квадратичной чистки постфактум. Возвращает число добавленных.
+    """
+    added = 0
+    for quote in page_quotes:
+        digest = hashlib.blake2b(
+            quote["text"].encode(), digest_size=8
+        ).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        quotes.append(quote)
+        added += 1
+    return added
+
+
+class RateLimiter:
+    """Выдаёт «токен» раз в interval секунд, общий для всех потоков.
+
+    Потоки дают параллелизм по сети (ожидания ответов перекрываются),
+    а лимитер сохраняет прежний вежливый темп обращений к сайту: токен
+    один на всех воркеров, поэтому interval — это полная пауза DELAY
+    между запросами, сколько бы потоков её ни делило.
+    """
+
+    def __init__(self, interval):
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next_at - now)
+            self._next_at = max(now, self._next_at) + self._interval
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,157 @@
+"""Сборщик цитат с русского Викицитатника.
+
+Обходит страницы авторов, вытаскивает элементы списков, чистит текст от
+сносок и викиразметки, прогоняет через общий валидатор и складывает
+результат в JSON-файл для последующего слияния и импорта в базу.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import orjson
+import requests
+
+from harvest_utils import RateLimiter, add_unique
+from quote_filters import is_valid_quotation
+
+try:  # кэш ответов с условными GET: викитекст авторов меняется редко,
+    # и повторный прогон получает 304 без повторной загрузки
+    from requests_cache import CachedSession
+except ImportError:
+    CachedSession = None
+
+logger = logging.getLogger(__name__)
+
+# Action API отдаёт викитекст страницы как JSON: ~в 5 раз меньше байт,
+# чем полный HTML, и разбор сводится к одному regex по строкам списка
+# вместо построения DOM-дерева.
+API_URL = "https://ru.wikiquote.org/w/api.php"
+DELAY = 5  # суммарный темп запросов к сайту остаётся прежним
+WORKERS = 4
+OUTPUT_FILE = "wikiquote_ru.json"
+
+headers = {"User-Agent": "tgBot-Logosphera/1.0"}
+
+AUTHORS = [
+    "Лев_Толстой", "Фёдор_Достоевский", "Антон_Чехов", "Александр_Пушкин",
+    "Николай_Гоголь", "Иван_Тургенев", "Михаил_Булгаков", "Максим_Горький",
+    "Владимир_Набоков", "Борис_Пастернак", "Анна_Ахматова", "Марина_Цветаева",
+    "Сергей_Есенин", "Владимир_Маяковский", "Александр_Блок", "Иосиф_Бродский",
+    "Михаил_Лермонтов", "Иван_Бунин", "Александр_Солженицын", "Николай_Некрасов",
+    "Фёдор_Тютчев", "Афанасий_Фет", "Александр_Грибоедов", "Иван_Крылов",
+    "Денис_Фонвизин", "Александр_Островский", "Михаил_Салтыков-Щедрин",
+]
+
+# Одна слитая альтернация вместо двух последовательных sub: clean_text
+# зовётся на каждый элемент списка, которых на странице автора тысячи,
+# и лишние полные проходы по строке с промежуточными str-аллокациями
+# там заметны. Паттерн сносок [\d+] — частный случай скобочного, так
+# что отдельный проход ему не нужен; схлопывание пробелов — C-уровневый
+# split/join без третьего захода regex-движка.
+_MARKUP_RE = re.compile(r"\[[^\]]*\]|<[^>]+>")
+
+
+def clean_text(text):
+    """Убирает сноски, викиразметку в скобках и лишние пробелы."""
+    return " ".join(_MARKUP_RE.sub("", text).split())
+
+
+_rate_limiter = RateLimiter(DELAY)
+
+# Одна сессия на процесс: keep-alive вместо нового TCP+TLS рукопожатия
+# на каждого автора; размер пула соединений совпадает с числом воркеров.
+# С requests-cache повторные прогоны шлют ETag/Last-Modified и на 304
+# берут тело из локального sqlite-кэша.
+if CachedSession is not None:
+    _session = CachedSession(
+        "wikiquote_ru_cache", expire_after=86400, cache_control=True
+    )
+else:
+    _session = requests.Session()
+_session.headers.update(headers)
+_session.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=WORKERS, pool_maxsize=WORKERS),
+)
+
+
+def fetch_author(author):
+    _rate_limiter.acquire()
+    response = _session.get(
+        API_URL,
+        params={
+            "action": "parse",
+            "page": author,
+            "prop": "wikitext",
+            "format": "json",
+            "formatversion": 2,
+        },
+        timeout=30,
+    )
+    response.raise_for_status()
+    return response.json()["parse"]["wikitext"]
+
+
+# Строки-элементы списка (цитаты в Викицитатнике — это `* ...`) и два
+# паттерна снятия викиразметки: [[ссылка|текст]] -> текст, а шаблоны,
+# ref-сноски и апострофы выделения выкидываются целиком.
+_LIST_ITEM_RE = re.compile(r"^\*+\s*(.+)$", re.MULTILINE)
+_WIKI_LINK_RE = re.compile(r"\[\[(?:[^|\]]*\|)?([^\]]*)\]\]")
+_WIKI_MARKUP_RE = re.compile(r"\{\{[^{}]*\}\}|<ref[^<]*(?:</ref>|/>)|'{2,}")
+
+
+def _iter_texts(wikitext):
+    """Тексты элементов-кандидатов из викитекста страницы автора."""
+    for match in _LIST_ITEM_RE.finditer(wikitext):
+        line = _WIKI_LINK_RE.sub(r"\1", match.group(1))
+        yield clean_text(_WIKI_MARKUP_RE.sub("", line))
+
+
+def parse_author_page(wikitext, author):
+    author_name = author.replace("_", " ")
+    quotes = []
+    for text in _iter_texts(wikitext):
+        if not is_valid_quotation(text):
+            continue
+        quotes.append({
+            "text": text,
+            "author": author_name,
+            "source": "wikiquote.org",
+        })
+    return quotes
+
+
+def harvest():
+    quotes = []
+    # Дедупликация на лету: одна цитата нередко живёт и на странице
+    # автора, и на странице произведения. Множество хранит короткие
+    # blake2b-дайджесты (см. add_unique), а не сами тексты.
+    seen = set()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futures = {
+            pool.submit(fetch_author, author): author for author in AUTHORS
+        }
+        for future in as_completed(futures):
+            author = futures[future]
+            try:
+                wikitext = future.result()
+            except (requests.RequestException, KeyError) as exc:
+                logger.warning("Автор %s не получен: %s", author, exc)
+                continue
+            added = add_unique(quotes, parse_author_page(wikitext, author), seen)
+            logger.info("Автор %s: %s новых цитат", author, added)
+    return quotes
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    quotes = harvest()
+    logger.info("Собрано %s цитат", len(quotes))
+    # orjson сериализует на порядок быстрее stdlib-json и сразу в bytes
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(quotes, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Сборщик англоязычных цитат из API zenquotes.io.
+
+Дёргает endpoint случайной цитаты, чистит текст, прогоняет через общий
+валидатор и складывает результат в JSON-файл для слияния конвейером.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import orjson
+import requests
+
+from harvest_utils import RateLimiter, add_unique
+from quote_filters import is_valid_quotation
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://zenquotes.io/api/random"
+DELAY = 1  # лимит API: не чаще запроса в секунду суммарно
+WORKERS = 4
+MAX_QUOTES = 500
+OUTPUT_FILE = "zenquotes.json"
+
+headers = {"User-Agent": "tgBot-Logosphera/1.0"}
+
+# Одна сессия на процесс: keep-alive вместо нового TCP+TLS рукопожатия
+# на каждый запрос; размер пула соединений совпадает с числом воркеров.
+_session = requests.Session()
+_session.headers.update(headers)
+_session.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=WORKERS, pool_maxsize=WORKERS),
+)
+
+# Общий лимитер на всех воркеров: запросы уходят не чаще DELAY, но
+# ожидание ответа перекрывается с ожиданием слота следующим потоком —
+# sleep из тела цикла больше не складывается с сетевой задержкой.
+_rate_limiter = RateLimiter(DELAY)
+
+
+def clean_text(text):
+    """Схлопывает пробелы и снимает обрамляющие кавычки."""
+    return " ".join(text.split()).strip('"“” ')
+
+
+def fetch_one():
+    _rate_limiter.acquire()
+    try:
+        response = _session.get(API_URL, timeout=15)
+        response.raise_for_status()
+        return response.json()
+    except (requests.RequestException, ValueError) as exc:
+        logger.warning("Запрос не удался: %s", exc)
+        return []
+
+
+def harvest(max_quotes=MAX_QUOTES):
+    quotes = []
+    seen = set()
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        # Запас на отбраковку и дубли; лишние задания снимаются, как
+        # только цель набрана.
+        futures = [pool.submit(fetch_one) for _ in range(max_quotes * 2)]
+        for future in as_completed(futures):
+            batch = []
+            for item in future.result():
+                text = clean_text(item.get("q", ""))
+                if not is_valid_quotation(text, lang="en"):
+                    continue
+                batch.append({
+                    "text": text,
+                    "author": item.get("a"),
+                    "source": "zenquotes.io",
+                })
+            # Множество хранит короткие blake2b-дайджесты (см.
+            # add_unique), а не сами тексты.
+            add_unique(quotes, batch, seen)
+            if len(quotes) >= max_quotes:
+                break
+        for future in futures:
+            future.cancel()
+    return quotes
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    quotes = harvest()
+    logger.info("Собрано %s цитат", len(quotes))
+    with open(OUTPUT_FILE, "wb") as f:
+        f.write(orjson.dumps(quotes, option=orjson.OPT_INDENT_2))
+
+
+if __name__ == "__main__":
+    main()
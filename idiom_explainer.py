@@ -0,0 +1,36 @@
+"""Форматирование карточки идиомы для отправки в чат."""
+
+import functools
+
+
+def format_idiom_explanation(idiom):
+    """Markdown-карточка идиомы: текст, перевод, значение, пример.
+
+    Контент идиом неизменяем, поэтому готовый текст кэшируется по полям;
+    словарь разворачивается в хэшируемые аргументы для lru_cache.
+    """
+    return _format_cached(
+        idiom["id"],
+        idiom["text_ru"],
+        idiom["text_en"],
+        idiom["meaning"],
+        idiom.get("example"),
+        idiom.get("topic"),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_cached(idiom_id, text_ru, text_en, meaning, example, topic):
+    lines = [
+        f"*{text_ru}*",
+        f"_{text_en}_",
+        "",
+        f"📝 {meaning}",
+    ]
+    if example:
+        lines.append("")
+        lines.append(f"💬 Пример: {example}")
+    if topic:
+        lines.append("")
+        lines.append(f"🏷 Тема: {topic}")
+    return "\n".join(lines)
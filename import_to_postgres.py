@@ -0,0 +1,100 @@
+"""Ручной импорт ALL_QUOTES.json в PostgreSQL.
+
+Standalone-аналог import-стадии конвейера: запускается руками, когда
+объединённый корпус нужно долить в базу без прогона сборщиков.
+Дубликаты отсекает сервер по уникальному индексу md5(text).
+"""
+
+import json
+import logging
+import os
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+try:  # потоковый парсер: файл не материализуется в памяти целиком
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+INPUT_FILE = "ALL_QUOTES.json"
+BATCH_SIZE = 1000
+
+_INSERT_SQL = (
+    "INSERT INTO quotations (text, author, source) VALUES %s "
+    "ON CONFLICT ((md5(text))) DO NOTHING"
+)
+
+
+def _iter_quotes(path):
+    """Цитаты из файла по одной; с ijson — O(1) памяти на любой корпус."""
+    if ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "item")
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+
+
+def _import_batch(conn, cur, batch):
+    """Вставляет партию одним запросом, возвращает число новых строк.
+
+    Партия с битой строкой откатывается и доливается построчно, чтобы
+    одна запись не топила остальные.
+    """
+    try:
+        execute_values(cur, _INSERT_SQL, batch, page_size=BATCH_SIZE)
+        inserted = cur.rowcount
+    except psycopg2.Error as exc:
+        conn.rollback()
+        logger.warning("Партия не прошла (%s) — построчно", exc)
+        inserted = 0
+        for row in batch:
+            # SAVEPOINT на строку: откат ошибочной не трогает уже
+            # вставленные в этом же цикле, но ещё не закоммиченные.
+            cur.execute("SAVEPOINT import_row")
+            try:
+                execute_values(cur, _INSERT_SQL, [row])
+                inserted += cur.rowcount
+                cur.execute("RELEASE SAVEPOINT import_row")
+            except psycopg2.Error as row_exc:
+                cur.execute("ROLLBACK TO SAVEPOINT import_row")
+                logger.warning("Строка пропущена: %s", row_exc)
+    conn.commit()
+    return inserted
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    conn = psycopg2.connect(os.getenv("DATABASE_URL", "dbname=logosphera"))
+    cur = conn.cursor()
+    # Индекс есть у баз, созданных текущим бутстрапом; для старых — догоняем.
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_quotations_text_md5 "
+        "ON quotations ((md5(text)))"
+    )
+    saved = skipped = 0
+    batch = []
+    # Поток из файла сразу наполняет партии execute_values: первая
+    # вставка уходит в БД до конца парсинга, а в памяти в каждый момент
+    # не больше одной партии.
+    for quote in _iter_quotes(INPUT_FILE):
+        batch.append((quote["text"], quote.get("author"), quote.get("source")))
+        if len(batch) >= BATCH_SIZE:
+            inserted = _import_batch(conn, cur, batch)
+            saved += inserted
+            skipped += len(batch) - inserted
+            batch = []
+    if batch:
+        inserted = _import_batch(conn, cur, batch)
+        saved += inserted
+        skipped += len(batch) - inserted
+    cur.close()
+    conn.close()
+    logger.info("Импорт завершён: %s добавлено, %s пропущено", saved, skipped)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Генерация упражнений по идиомам."""
+
+import random
+
+try:  # numba и numpy — необязательные ускорители; без них считаем на Python
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _distractor_scores(topic_match, length_diff):
+        """Числовое ядро ранжирования; cache=True — компиляция один раз."""
+        out = np.empty(topic_match.shape[0], np.float64)
+        for i in range(topic_match.shape[0]):
+            out[i] = 2.0 * topic_match[i] - length_diff[i] / 50.0
+        return out
+
+else:
+    _distractor_scores = None
+
+
+class PracticeModule:
+    """Строит вопросы с вариантами ответов по изученным идиомам."""
+
+    def generate_exercise(self, idiom, all_idioms):
+        """Вопрос «что значит идиома» с четырьмя вариантами значения."""
+        distractors = self._rank_distractors(idiom, all_idioms)
+        options = [idiom["meaning"]] + distractors[:3]
+        random.shuffle(options)
+        return {
+            "idiom_id": idiom["id"],
+            "question": idiom["text_ru"],
+            "options": options,
+            "correct": options.index(idiom["meaning"]),
+        }
+
+    def _rank_distractors(self, idiom, all_idioms):
+        """Значения других идиом, отсортированные по «похожести» на ответ.
+
+        Похожие по теме и длине варианты сложнее отличить от правильного,
+        поэтому они идут первыми. Признаки собираются один раз в плоские
+        массивы; само ранжирование — числовой цикл, при наличии numba
+        он выполняется скомпилированным.
+        """
+        target_len = len(idiom["meaning"])
+        meanings = []
+        topic_match = []
+        length_diff = []
+        for other in all_idioms:
+            if other["id"] == idiom["id"]:
+                continue
+            meanings.append(other["meaning"])
+            topic_match.append(1 if other.get("topic") == idiom.get("topic") else 0)
+            length_diff.append(abs(len(other["meaning"]) - target_len))
+        if _distractor_scores is not None:
+            scores = _distractor_scores(
+                np.asarray(topic_match, dtype=np.int64),
+                np.asarray(length_diff, dtype=np.int64),
+            )
+            order = np.argsort(-scores)
+            return [meanings[i] for i in order]
+        scored = [
+            (2.0 * match - diff / 50.0, meaning)
+            for match, diff, meaning in zip(topic_match, length_diff, meanings)
+        ]
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [meaning for _, meaning in scored]
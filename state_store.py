@@ -0,0 +1,103 @@
+"""Состояние диалога пользователя в Redis.
+
+Раньше состояние жило в process-local словаре `user_states` внутри bot.py:
+оно терялось при рестарте и не позволяло запускать несколько воркеров.
+Здесь то же состояние хранится в Redis как JSON с TTL.
+"""
+
+import asyncio
+import logging
+import os
+
+import cachetools
+import msgpack
+import orjson
+import redis.asyncio as aredis
+
+logger = logging.getLogger(__name__)
+
+STATE_TTL = 3600  # час бездействия — и состояние диалога можно забыть
+
+
+class StateStore:
+    """Читает и пишет JSON-сериализованное состояние по ключу `st:{uid}`."""
+
+    def __init__(self, url=None):
+        self._redis = aredis.from_url(
+            url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        )
+
+    async def get(self, user_id):
+        raw = await self._redis.get(f"st:{user_id}")
+        return orjson.loads(raw) if raw else {}
+
+    async def set(self, user_id, mapping):
+        await self._redis.setex(f"st:{user_id}", STATE_TTL, orjson.dumps(mapping))
+
+    async def update(self, user_id, **fields):
+        state = await self.get(user_id)
+        state.update(fields)
+        await self.set(user_id, state)
+
+    async def clear(self, user_id):
+        await self._redis.delete(f"st:{user_id}")
+
+
+class _EvictingLRU(cachetools.LRUCache):
+    """LRU с отметкой в логе при вытеснении — видно, когда лимит мал."""
+
+    def popitem(self):
+        key, value = super().popitem()
+        logger.info("Состояние пользователя %s вытеснено из LRU", key)
+        return key, value
+
+
+class InMemoryStateStore:
+    """Запасной вариант без Redis: тот же интерфейс, состояние в памяти.
+
+    Вместо словаря, растущего на каждого когда-либо нажавшего кнопку
+    пользователя, — LRU с жёсткой верхней границей памяти.
+
+    При наличии db каждое изменение сквозным образом пишется в таблицу
+    user_state как msgpack-блоб, а промах в LRU долечивается из БД —
+    бот продолжает диалог с места, где его прервал рестарт.
+    """
+
+    def __init__(self, maxsize=50_000, db=None):
+        self._states = _EvictingLRU(maxsize=maxsize)
+        self._db = db
+
+    async def get(self, user_id):
+        state = self._states.get(user_id)
+        if state is None and self._db is not None:
+            blob = await asyncio.to_thread(self._db.load_state, user_id)
+            if blob:
+                state = msgpack.unpackb(blob, raw=False)
+                self._states[user_id] = state
+        return dict(state) if state else {}
+
+    async def set(self, user_id, mapping):
+        state = dict(mapping)
+        self._states[user_id] = state
+        if self._db is not None:
+            blob = msgpack.packb(state, use_bin_type=True)
+            await asyncio.to_thread(self._db.save_state, user_id, blob)
+
+    async def update(self, user_id, **fields):
+        state = await self.get(user_id)
+        state.update(fields)
+        await self.set(user_id, state)
+
+    async def clear(self, user_id):
+        self._states.pop(user_id, None)
+        if self._db is not None:
+            await asyncio.to_thread(self._db.delete_state, user_id)
+
+
+def make_state_store(db=None):
+    """Redis, если настроен REDIS_URL; иначе LRU в памяти поверх БД."""
+    url = os.getenv("REDIS_URL")
+    if url:
+        return StateStore(url)
+    logger.info("REDIS_URL не задан — состояние в in-memory LRU с записью в БД")
+    return InMemoryStateStore(db=db)